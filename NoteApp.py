@@ -2,8 +2,41 @@ import tkinter as tk
 from tkinter import messagebox, simpledialog
 from enum import Enum
 from datetime import datetime
+from functools import lru_cache
 import json
 import os
+import queue
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+try:
+    import orjson  # Быстрый сериализатор JSON; если он не установлен, используем json.
+except ImportError:
+    orjson = None
+
+
+def _encode_json(data):
+    """
+    Кодирует данные в компактный JSON (без отступов) и возвращает байты UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_json(raw_data):
+    """
+    Разбирает JSON из байтов.
+    """
+    if orjson is not None:
+        return orjson.loads(raw_data)
+    return json.loads(raw_data)
+
+
+# Разбор дат с кэшем: у заметок, импортированных пачкой, метки времени часто совпадают.
+_parse_datetime = lru_cache(maxsize=4096)(datetime.fromisoformat)
 
 
 class NoteCategory(Enum):
@@ -19,27 +52,70 @@ class NoteCategory(Enum):
     MISC = "Разное"
 
 
+# Соответствие значения категории и ее члена перечисления для быстрого поиска
+_CAT_BY_VALUE = {cat.value: cat for cat in NoteCategory}
+
+
+def _category_value(category):
+    """
+    Возвращает название категории строкой. Принимает как NoteCategory, так и строку;
+    строки интернируются, чтобы у заметок одной категории был общий объект строки.
+    """
+    if isinstance(category, NoteCategory):
+        return category.value
+    return sys.intern(category)
+
+
 class Note:
     """
     Класс, описывающий структуру заметки.
 
     Атрибуты:
+        note_id (str): Уникальный идентификатор заметки.
         title (str): Название заметки (не более 50 символов).
-        category (NoteCategory): Категория, к которой относится заметка.
+        category (str): Название категории (значение NoteCategory), к которой относится заметка.
         content (str): Содержимое заметки.
         created_at (datetime): Дата и время создания заметки.
         updated_at (datetime): Дата и время последнего обновления заметки.
+        display_text (str): Строка для списка заметок: название и категория.
+
+    Содержимое заметки, загруженной из снимка, читается с диска только при первом обращении.
     """
 
     def __init__(self, heading="Без названия", category=NoteCategory.MISC, content_body=""):
         """
         Инициализирует экземпляр заметки с заданными параметрами.
         """
+        self.note_id = uuid.uuid4().hex
         self.title = heading[:50]  # Ограничиваем длину названия 50 символами.
-        self.category = category
+        self.category = _category_value(category)
         self.content = content_body
         self.created_at = datetime.now()
         self.updated_at = self.created_at
+        self.display_text = f"{self.title} ({self.category})"
+
+    @property
+    def content(self):
+        """Содержимое заметки; при первом обращении загружается из файла содержимого."""
+        if self._content is None:
+            self._content = ProjectManager.read_content(*self._content_ref)
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    @property
+    def content_loaded(self):
+        """Загружено ли уже содержимое заметки в память."""
+        return self._content is not None
+
+    def load_content(self, raw_contents):
+        """
+        Берет содержимое заметки из уже прочитанных байтов файла содержимого.
+        """
+        offset, length = self._content_ref
+        self._content = raw_contents[offset:offset + length].decode("utf-8")
 
     def update(self, heading=None, category=None, content_body=None):
         """
@@ -50,10 +126,11 @@ class Note:
         if heading:
             self.title = heading[:50]
         if category:
-            self.category = category
+            self.category = _category_value(category)
         if content_body:
             self.content = content_body
         self.updated_at = datetime.now()
+        self.display_text = f"{self.title} ({self.category})"
 
     def to_dict(self):
         """
@@ -62,8 +139,9 @@ class Note:
      
         """
         return {
+            "id": self.note_id,
             "title": self.title,
-            "category": self.category.value,
+            "category": self.category,
             "content": self.content,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
@@ -76,22 +154,39 @@ class Note:
         """
         note_instance = cls(
             heading=data["title"],
-            category=NoteCategory(data["category"]),
-            content_body=data["content"]
+            category=data["category"],
+            content_body=data.get("content", "")
         )
-        note_instance.created_at = datetime.fromisoformat(data["created_at"])
-        note_instance.updated_at = datetime.fromisoformat(data["updated_at"])
+        # В снимке хранится только положение содержимого в файле; само оно читается по требованию
+        if "content" not in data:
+            note_instance._content = None
+            note_instance._content_ref = (data["content_offset"], data["content_length"])
+        # В файлах старого формата идентификатора нет, тогда остается сгенерированный;
+        # такие снимки ProjectManager.load_project сразу перезаписывает
+        if "id" in data:
+            note_instance.note_id = data["id"]
+        note_instance.created_at = _parse_datetime(data["created_at"])
+        note_instance.updated_at = _parse_datetime(data["updated_at"])
         return note_instance
 
 
 class Project:
     """
     Класс для управления коллекцией заметок.
+
+    Атрибуты:
+        memo_collection (list[Note]): Заметки проекта.
+        display_titles (list[str]): Строки для списка заметок, параллельные memo_collection.
+        version (int): Счетчик изменений коллекции, растет при каждом изменении.
     """
 
     def __init__(self):
         """Создает пустую коллекцию заметок."""
         self.memo_collection = []
+        self.display_titles = []
+        self.version = 0
+        self._search_index = []
+        self._search_index_version = -1
 
     def add_note(self, note_obj):
         """
@@ -99,6 +194,18 @@ class Project:
 
         """
         self.memo_collection.append(note_obj)
+        self.display_titles.append(note_obj.display_text)
+        self.version += 1
+
+    def update_note(self, index, heading=None, category=None, content_body=None):
+        """
+        Обновляет заметку с заданным индексом и возвращает ее.
+        """
+        note_obj = self.memo_collection[index]
+        note_obj.update(heading=heading, category=category, content_body=content_body)
+        self.display_titles[index] = note_obj.display_text
+        self.version += 1
+        return note_obj
 
     def remove_note_by_index(self, index):
         """
@@ -106,11 +213,38 @@ class Project:
         """
         if 0 <= index < len(self.memo_collection):
             del self.memo_collection[index]
+            del self.display_titles[index]
+            self.version += 1
+
+    def replace_notes(self, notes):
+        """
+        Заменяет всю коллекцию заметок новым списком.
+        """
+        self.memo_collection = list(notes)
+        self.display_titles = [n.display_text for n in self.memo_collection]
+        self.version += 1
+
+    def filter(self, query):
+        """
+        Возвращает индексы заметок, в названии которых встречается query (без учета регистра).
+        """
+        # Индекс названий в нижнем регистре перестраивается только после изменения коллекции
+        if self._search_index_version != self.version:
+            self._search_index = [(n.title.lower(), i) for i, n in enumerate(self.memo_collection)]
+            self._search_index_version = self.version
+        query = query.lower()
+        return [i for lower_title, i in self._search_index if query in lower_title]
 
     def to_dict(self):
         """
         Преобразует весь проект (коллекцию заметок) в словарь для сериализации.
         """
+        # Еще не загруженное содержимое берем из одного чтения файла, а не по заметке
+        unloaded_notes = [n for n in self.memo_collection if not n.content_loaded]
+        if unloaded_notes:
+            raw_contents = ProjectManager.read_contents()
+            for n in unloaded_notes:
+                n.load_content(raw_contents)
         return {
             "notes": [n.to_dict() for n in self.memo_collection]
         }
@@ -121,42 +255,187 @@ class Project:
         Восстанавливает коллекцию заметок из словаря.
         """
         project_instance = cls()
-        project_instance.memo_collection = [
+        project_instance.replace_notes(
             Note.from_dict(note_data) for note_data in data["notes"]
-        ]
+        )
         return project_instance
 
 
 class ProjectManager:
     """
     Класс, обеспечивающий сохранение и загрузку проекта (коллекции заметок) в файл.
+
+    Полное состояние проекта хранится в снимке (JSON-файл), а правки, сделанные
+    после последнего снимка, дописываются в журнал (JSON Lines) по одной записи
+    на операцию. При загрузке журнал применяется поверх снимка.
     """
-    DEFAULT_FILE_PATH = os.path.join(os.path.dirname(__file__), "contacts.json")
+    DEFAULT_FILE_PATH = Path(__file__).with_name("contacts.json")
+    JOURNAL_FILE_PATH = Path(__file__).with_name("contacts.jsonl")
+
+    # Количество записей в журнале с момента последнего снимка
+    journal_length = 0
+    # Файл содержимого, на который ссылается загруженный снимок
+    contents_file_path = None
+
+    @staticmethod
+    def write_snapshot(project_data):
+        """
+        Записывает словарь проекта на диск и очищает журнал.
+        Только работа с диском, поэтому метод можно вызывать из фонового потока.
+
+        Содержимое заметок подряд записывается в новый файл содержимого, а JSON-файл
+        (индекс) хранит его имя и для каждой заметки смещение и длину ее содержимого в байтах.
+        Индекс заменяется атомарно, поэтому после сбоя на диске остается либо старый,
+        либо новый снимок целиком.
+        """
+        contents = []
+        index_notes = []
+        offset = 0
+        for note_data in project_data["notes"]:
+            encoded_content = note_data["content"].encode("utf-8")
+            contents.append(encoded_content)
+            index_entry = {key: value for key, value in note_data.items() if key != "content"}
+            index_entry["content_offset"] = offset
+            index_entry["content_length"] = len(encoded_content)
+            index_notes.append(index_entry)
+            offset += len(encoded_content)
+
+        # У каждого снимка свой файл содержимого, поэтому старый индекс
+        # продолжает ссылаться на целый старый файл, пока не будет заменен
+        index_path = ProjectManager.DEFAULT_FILE_PATH
+        contents_path = index_path.with_name(f"{index_path.stem}-{uuid.uuid4().hex}.dat")
+        ProjectManager._write_durably(contents_path, b"".join(contents))
+
+        # Индекс записываем последним, когда содержимое уже на диске.
+        # Кодируем его целиком заранее и записываем одним вызовом write,
+        # вместо множества мелких записей, которые делает json.dump.
+        payload = _encode_json({**project_data, "contents_file": contents_path.name, "notes": index_notes})
+        temp_path = index_path.with_name(index_path.name + ".tmp")
+        ProjectManager._write_durably(temp_path, payload)
+        os.replace(temp_path, index_path)
+        open(ProjectManager.JOURNAL_FILE_PATH, "wb").close()
+
+        # Файлы содержимого прежних снимков больше ни на что не ссылаются
+        for stale_path in index_path.parent.glob(f"{index_path.stem}*.dat"):
+            if stale_path != contents_path:
+                stale_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write_durably(path, payload):
+        """
+        Записывает данные в файл одним вызовом write и дожидается их сброса на диск.
+        """
+        with open(path, "wb") as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
 
     @staticmethod
-    def save_project(project):
+    def read_content(offset, length):
         """
-        Сохраняет проект (коллекцию заметок) в JSON-файл.
+        Читает содержимое одной заметки из файла содержимого.
         """
-        with open(ProjectManager.DEFAULT_FILE_PATH, "w", encoding="utf-8") as file:
-            json.dump(project.to_dict(), file, ensure_ascii=False, indent=4)
+        with open(ProjectManager.contents_file_path, "rb") as file:
+            file.seek(offset)
+            return file.read(length).decode("utf-8")
+
+    @staticmethod
+    def read_contents():
+        """
+        Читает файл содержимого целиком одним вызовом.
+        """
+        return ProjectManager.contents_file_path.read_bytes()
+
+    @staticmethod
+    def write_journal(records):
+        """
+        Дописывает записи в конец журнала одним вызовом write.
+        Только работа с диском, поэтому метод можно вызывать из фонового потока.
+        """
+        payload = b"".join(_encode_json(record) + b"\n" for record in records)
+        with open(ProjectManager.JOURNAL_FILE_PATH, "ab") as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+
+    @staticmethod
+    def plan_save(project, records):
+        """
+        Учитывает записи, которые будут дописаны в журнал, и решает, не пора ли
+        заменить журнал новым снимком: это нужно, когда журнал стал заметно длиннее
+        самой коллекции заметок. Возвращает словарь снимка или None.
+        """
+        ProjectManager.journal_length += len(records)
+        if ProjectManager.journal_length <= 2 * len(project.memo_collection):
+            return None
+        project_data = project.to_dict()
+        ProjectManager.journal_length = 0
+        return project_data
 
     @staticmethod
     def load_project():
         """
-        Загружает проект (коллекцию заметок) из JSON-файла.
+        Загружает проект (коллекцию заметок) из JSON-файла и применяет к нему журнал.
+        Содержимое заметок при этом не читается.
         """
-        if os.path.exists(ProjectManager.DEFAULT_FILE_PATH):
-            with open(ProjectManager.DEFAULT_FILE_PATH, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                return Project.from_dict(data)
-        return Project()
+        # Читаем файл целиком одним вызовом и только потом разбираем JSON.
+        # Отсутствие файла обрабатываем исключением, без отдельной проверки os.path.exists.
+        try:
+            raw_data = ProjectManager.DEFAULT_FILE_PATH.read_bytes()
+        except FileNotFoundError:
+            project = Project()
+        else:
+            data = _decode_json(raw_data)
+            ProjectManager.contents_file_path = ProjectManager.DEFAULT_FILE_PATH.with_name(
+                data.get("contents_file", f"{ProjectManager.DEFAULT_FILE_PATH.stem}.dat")
+            )
+            project = Project.from_dict(data)
+            # В снимках старого формата у заметок нет идентификаторов, и загрузка
+            # выдает им новые. Сразу записываем снимок с ними, иначе записи журнала
+            # после перезапуска не найдут свои заметки.
+            if any("id" not in note_data for note_data in data["notes"]):
+                ProjectManager.write_snapshot(project.to_dict())
+        ProjectManager._replay_journal(project)
+        return project
+
+    @staticmethod
+    def _replay_journal(project):
+        """
+        Применяет к проекту записи журнала в порядке их появления.
+        """
+        ProjectManager.journal_length = 0
+        try:
+            file = open(ProjectManager.JOURNAL_FILE_PATH, "r+b")
+        except FileNotFoundError:
+            return
+        with file:
+            raw_data = file.read()
+            # Недописанную последнюю строку (после аварийного завершения) отбрасываем,
+            # чтобы следующие записи не склеились с ней
+            if raw_data and not raw_data.endswith(b"\n"):
+                raw_data = raw_data[:raw_data.rfind(b"\n") + 1]
+                file.truncate(len(raw_data))
+
+        # Словарь сохраняет порядок заметок, а повторное применение записи ничего не ломает
+        notes_by_id = {n.note_id: n for n in project.memo_collection}
+        for line in raw_data.splitlines():
+            if not line:
+                continue
+            record = _decode_json(line)
+            if record["op"] == "del":
+                notes_by_id.pop(record["id"], None)
+            else:
+                notes_by_id[record["id"]] = Note.from_dict(record)
+            ProjectManager.journal_length += 1
+        project.replace_notes(notes_by_id.values())
 
 
 class NoteApp:
     """
     Основной класс приложения для управления заметками при помощи графического интерфейса на Tkinter.
     """
+    SAVE_DELAY_MS = 500  # Задержка перед записью на диск, чтобы серия правок сохранялась одним разом.
+    SEARCH_DELAY_MS = 150  # Задержка перед фильтрацией списка, пока пользователь набирает запрос.
 
     def __init__(self, main_window):
         """
@@ -170,7 +449,25 @@ class NoteApp:
         self.current_project = ProjectManager.load_project()
         self.current_note_idx = None
 
+        # Еще не записанные в журнал изменения и отложенная задача сохранения
+        self._pending_records = []
+        self._save_job = None
+
+        # Запись на диск выполняется в фоновом потоке, чтобы не блокировать интерфейс
+        self._save_queue = queue.Queue()
+        self._save_error = None
+        self._save_thread = threading.Thread(target=self._save_worker, daemon=True)
+        self._save_thread.start()
+
+        # Строки, которые сейчас показаны в списке заметок, индексы соответствующих им заметок
+        # и состояние (версия проекта и поисковый запрос), по которому они построены
+        self._last_titles = []
+        self._visible_indices = []
+        self._rendered_state = None
+        self._search_job = None
+
         self._setup_interface()
+        self.main_window.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _setup_interface(self):
         """
@@ -182,9 +479,24 @@ class NoteApp:
         self.right_panel = tk.Frame(self.main_window)
         self.right_panel.pack(side=tk.RIGHT, expand=True, fill=tk.BOTH)
 
-        # Список заметок
-        self.notes_listbox = tk.Listbox(self.left_panel)
-        self.notes_listbox.pack(fill=tk.BOTH, expand=True)
+        # Поиск по названию заметки
+        tk.Label(self.left_panel, text="Search:").pack(anchor=tk.W)
+        self.search_query = tk.StringVar()
+        self.search_query.trace_add("write", self._on_search_changed)
+        self.search_input = tk.Entry(self.left_panel, textvariable=self.search_query)
+        self.search_input.pack(fill=tk.X)
+
+        # Список заметок. Listbox сам отрисовывает только видимые строки,
+        # поэтому для длинного списка достаточно добавить к нему прокрутку.
+        self.notes_frame = tk.Frame(self.left_panel)
+        self.notes_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.notes_scrollbar = tk.Scrollbar(self.notes_frame, orient=tk.VERTICAL)
+        self.notes_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.notes_listbox = tk.Listbox(self.notes_frame, yscrollcommand=self.notes_scrollbar.set)
+        self.notes_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.notes_scrollbar.config(command=self.notes_listbox.yview)
         self.notes_listbox.bind("<<ListboxSelect>>", self._show_note_content)
 
         # Кнопки управления заметками
@@ -209,7 +521,7 @@ class NoteApp:
         self.main_window.config(menu=self.menu_bar)
 
         file_menu = tk.Menu(self.menu_bar, tearoff=0)
-        file_menu.add_command(label="Exit", command=self.main_window.quit)
+        file_menu.add_command(label="Exit", command=self._on_close)
         self.menu_bar.add_cascade(label="File", menu=file_menu)
 
         edit_menu = tk.Menu(self.menu_bar, tearoff=0)
@@ -247,7 +559,7 @@ class NoteApp:
         # Если редактируем, предварительно заполняем поля
         if existing_note:
             title_input.insert(0, existing_note.title)
-            category_value.set(existing_note.category.value)
+            category_value.set(existing_note.category)
             text_area.insert(1.0, existing_note.content)
 
         def _save_note():
@@ -260,15 +572,26 @@ class NoteApp:
                 messagebox.showerror("Error", "Title cannot exceed 50 characters!")
                 return
 
-            selected_category = NoteCategory(category_value.get())
+            # Проверяем, что выбрана известная категория
+            selected_category = _CAT_BY_VALUE[category_value.get()]
             note_text = text_area.get(1.0, tk.END).strip()
 
             if existing_note:
-                existing_note.update(
+                # Индекс ищем заново: пока диалог был открыт, список мог измениться,
+                # а саму заметку могли удалить из главного окна
+                try:
+                    note_index = self.current_project.memo_collection.index(existing_note)
+                except ValueError:
+                    messagebox.showerror("Error", "This note has been removed and cannot be saved.")
+                    note_dialog.destroy()
+                    return
+                self.current_project.update_note(
+                    note_index,
                     heading=heading,
                     category=selected_category,
                     content_body=note_text
                 )
+                self._schedule_save("upd", existing_note)
             else:
                 new_note_instance = Note(
                     heading=heading,
@@ -276,8 +599,8 @@ class NoteApp:
                     content_body=note_text
                 )
                 self.current_project.add_note(new_note_instance)
+                self._schedule_save("add", new_note_instance)
 
-            ProjectManager.save_project(self.current_project)
             self._update_notes_list()
             note_dialog.destroy()
 
@@ -294,6 +617,11 @@ class NoteApp:
             messagebox.showwarning("Warning", "No note selected!")
             return
         note_to_edit = self.current_project.memo_collection[self.current_note_idx]
+        try:
+            note_to_edit.content  # Загружаем содержимое заранее, чтобы заполнить им диалог
+        except OSError as error:
+            messagebox.showerror("Error", f"Could not read note content: {error}")
+            return
         self._open_note_dialog(note_to_edit)
 
     def remove_note(self):
@@ -306,7 +634,7 @@ class NoteApp:
         if user_confirmation:
             self.current_project.remove_note_by_index(self.current_note_idx)
             self.current_note_idx = None
-            ProjectManager.save_project(self.current_project)
+            self._schedule_save("del", note_to_remove)
             self._update_notes_list()
 
     def _show_note_content(self, event=None):
@@ -317,22 +645,166 @@ class NoteApp:
         if not selection:
             return
 
-        self.current_note_idx = selection[0]
+        self.current_note_idx = self._visible_indices[selection[0]]
         note_to_display = self.current_project.memo_collection[self.current_note_idx]
+        try:
+            note_content = note_to_display.content
+        except OSError as error:
+            messagebox.showerror("Error", f"Could not read note content: {error}")
+            return
 
         self.label_note_title.config(text=f"Title: {note_to_display.title}")
         self.text_note_content.config(state=tk.NORMAL)
-        self.text_note_content.delete(1.0, tk.END)
-        self.text_note_content.insert(1.0, note_to_display.content)
+        # Заменяем весь текст одной командой Tk вместо пары delete + insert
+        self.text_note_content.replace(1.0, tk.END, note_content)
         self.text_note_content.config(state=tk.DISABLED)
 
     def _update_notes_list(self):
         """
         Обновляет список заметок (Listbox) в левой панели, отражая текущую коллекцию.
         """
+        # Ни коллекция, ни запрос не менялись с прошлой отрисовки, перестраивать нечего
+        query = self.search_query.get().strip()
+        state = (self.current_project.version, query)
+        if state == self._rendered_state:
+            return
+        self._rendered_state = state
+
+        if query:
+            self._visible_indices = self.current_project.filter(query)
+            all_titles = self.current_project.display_titles
+            new_titles = [all_titles[i] for i in self._visible_indices]
+        else:
+            self._visible_indices = list(range(len(self.current_project.display_titles)))
+            new_titles = list(self.current_project.display_titles)
+        old_titles = self._last_titles
+        self._last_titles = new_titles
+
+        # Если изменилась одна строка, меняем только ее вместо перестроения всего списка
+        if len(new_titles) == len(old_titles):
+            changed = [i for i, (old, new) in enumerate(zip(old_titles, new_titles)) if old != new]
+            if len(changed) <= 1:
+                for i in changed:
+                    self.notes_listbox.delete(i)
+                    self.notes_listbox.insert(i, new_titles[i])
+                return
+        elif len(new_titles) == len(old_titles) + 1 and new_titles[:-1] == old_titles:
+            self.notes_listbox.insert(tk.END, new_titles[-1])
+            return
+        elif len(new_titles) == len(old_titles) - 1:
+            removed = next(
+                (i for i, (old, new) in enumerate(zip(old_titles, new_titles)) if old != new),
+                len(new_titles)
+            )
+            if new_titles[removed:] == old_titles[removed + 1:]:
+                self.notes_listbox.delete(removed)
+                return
+
+        # Все строки передаются в Tcl одной командой insert
         self.notes_listbox.delete(0, tk.END)
-        for memo_item in self.current_project.memo_collection:
-            self.notes_listbox.insert(tk.END, f"{memo_item.title} ({memo_item.category.value})")
+        if new_titles:
+            self.notes_listbox.insert(tk.END, *new_titles)
+
+    def _on_search_changed(self, *args):
+        """
+        Откладывает фильтрацию списка, чтобы не перестраивать его на каждое нажатие клавиши.
+        """
+        if self._search_job is not None:
+            self.main_window.after_cancel(self._search_job)
+        self._search_job = self.main_window.after(self.SEARCH_DELAY_MS, self._apply_search)
+
+    def _apply_search(self):
+        """Перестраивает список заметок по текущему поисковому запросу."""
+        self._search_job = None
+        self._update_notes_list()
+
+    def _schedule_save(self, operation, note):
+        """
+        Запоминает изменение заметки и откладывает запись на диск,
+        чтобы несколько правок подряд привели к одной записи в журнал.
+        """
+        if operation == "del":
+            self._pending_records.append({"op": "del", "id": note.note_id})
+        else:
+            self._pending_records.append({"op": operation, **note.to_dict()})
+        if self._save_job is not None:
+            self.main_window.after_cancel(self._save_job)
+        self._save_job = self.main_window.after(self.SAVE_DELAY_MS, self._flush_if_dirty)
+
+    def _flush_if_dirty(self):
+        """
+        Дописывает накопленные изменения в журнал, а если журнал слишком разросся,
+        заменяет его новым снимком проекта.
+        """
+        if self._save_job is not None:
+            self.main_window.after_cancel(self._save_job)
+            self._save_job = None
+        if self._save_error is not None:
+            save_error, self._save_error = self._save_error, None
+            messagebox.showerror("Error", f"Could not save notes: {save_error}")
+        if not self._pending_records:
+            return
+
+        # Счетчик журнала ведется в главном потоке, в момент постановки задачи в очередь.
+        # Задача — пара (записи журнала, снимок проекта или None).
+        try:
+            snapshot = ProjectManager.plan_save(self.current_project, self._pending_records)
+        except OSError as error:
+            # Файл содержимого недоступен: снимок не собрать, но правки все равно пишем в журнал
+            snapshot = None
+            messagebox.showerror("Error", f"Could not read notes content: {error}")
+        self._save_queue.put((self._pending_records, snapshot))
+        self._pending_records = []
+
+    def _save_worker(self):
+        """
+        Фоновый поток записи на диск. Забирает из очереди все накопившиеся задачи.
+        Записи, вошедшие в последний из снимков, дописывает в журнал до записи снимка:
+        так при сбое до очистки журнала его повторное применение к новому снимку дает
+        то же состояние, что и сам снимок. Записи после снимка дописывает в новый журнал.
+        """
+        while True:
+            jobs = [self._save_queue.get()]
+            while True:
+                try:
+                    jobs.append(self._save_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in jobs
+            jobs = [job for job in jobs if job is not None]
+            last_snapshot = max((i for i, (_, snapshot) in enumerate(jobs) if snapshot is not None), default=-1)
+            records_before = [record for batch, _ in jobs[:last_snapshot + 1] for record in batch]
+            records_after = [record for batch, _ in jobs[last_snapshot + 1:] for record in batch]
+
+            steps = []
+            if records_before:
+                steps.append((ProjectManager.write_journal, records_before))
+            if last_snapshot >= 0:
+                steps.append((ProjectManager.write_snapshot, jobs[last_snapshot][1]))
+            if records_after:
+                steps.append((ProjectManager.write_journal, records_after))
+
+            # Каждый шаг выполняем отдельно: если снимок не удалось записать, его записи
+            # уже есть в журнале, а последующие записи все равно дописываются.
+            # Ловим любые ошибки (в том числе кодирования), чтобы поток не завершился молча.
+            for write, data in steps:
+                try:
+                    write(data)
+                except Exception as error:
+                    self._save_error = error
+
+            if stop:
+                return
+
+    def _on_close(self):
+        """Сохраняет несохраненные изменения, дожидается их записи и закрывает приложение."""
+        self._flush_if_dirty()
+        self._save_queue.put(None)
+        self._save_thread.join()
+        if self._save_error is not None:
+            messagebox.showerror("Error", f"Could not save notes: {self._save_error}")
+        self.main_window.destroy()
 
     def _show_about_info(self):
         """Отображает информационное окно с данными о приложении."""